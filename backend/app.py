@@ -6,24 +6,87 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'database'))
 
-from flask import Flask, render_template, request, jsonify
+import logging
+import threading
+import uuid
+
+import cachetools
+import orjson
+from flask import Flask, g, render_template, request, jsonify, Response, stream_with_context
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
 from flask_cors import CORS
+from log_config import configure_logging
 from tutor import EnglishTutor
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 # Initialize database on startup
 try:
     from models import init_database
     init_database()
 except Exception as e:
-    print(f"Database initialization warning: {e}")
+    logger.warning("Database initialization warning: %s", e)
+
+class ORJSONProvider(JSONProvider):
+    """Serialize jsonify/request.json through orjson.
+
+    The multi-KB feedback payloads go through this on every response;
+    orjson is several times faster than the stdlib encoder and emits
+    bytes directly.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__,
             template_folder='../frontend/templates',
             static_folder='../frontend/static')
+app.json = ORJSONProvider(app)
 CORS(app)
 
-# Initialize the tutor
-tutor = EnglishTutor()
+# Compress JSON payloads - /api/feedback responses are multi-KB and
+# their repeated key names deflate well
+app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html']
+app.config['COMPRESS_MIN_SIZE'] = 512
+Compress(app)
+
+# One tutor per session so concurrent users don't interleave their
+# conversation histories in a single shared instance
+tutors = cachetools.LRUCache(maxsize=1024)
+tutors_lock = threading.Lock()
+
+
+def get_tutor() -> EnglishTutor:
+    """Get (or create) the tutor for the requesting session"""
+    session_id = (request.headers.get('X-Session-Id')
+                  or request.cookies.get('sid'))
+    if not session_id:
+        # First contact from this browser: mint an id now so even this
+        # request gets its own tutor, and hand it back as a cookie in
+        # after_request so later calls reuse it
+        session_id = uuid.uuid4().hex
+        g.new_sid = session_id
+    with tutors_lock:
+        tutor = tutors.get(session_id)
+        if tutor is None:
+            tutor = EnglishTutor()
+            tutors[session_id] = tutor
+    return tutor
+
+
+@app.after_request
+def _set_session_cookie(response):
+    sid = getattr(g, 'new_sid', None)
+    if sid is not None:
+        response.set_cookie('sid', sid, httponly=True, samesite='Lax',
+                            max_age=30 * 24 * 3600)
+    return response
 
 
 # Main pages
@@ -57,17 +120,17 @@ def terms():
 def chat():
     """Handle chat messages"""
     data = request.json
-    user_message = data.get('message', '')
+    user_message = (data.get('message') or '').strip()
 
     if not user_message:
         return jsonify({'error': 'No message provided'}), 400
 
     try:
-        result = tutor.process_message(user_message)
+        result = get_tutor().process_message(user_message)
         return jsonify(result)
 
     except Exception as e:
-        print(f"Error in chat: {e}")
+        logger.exception("Error in chat: %s", e)
         return jsonify({
             'message': 'Oh sorry, something went wrong on my end. Can you try that again?',
             'corrections': [],
@@ -76,14 +139,41 @@ def chat():
         })
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream the chat response token-by-token as Server-Sent Events"""
+    data = request.json
+    user_message = (data.get('message') or '').strip()
+
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+
+    tutor = get_tutor()
+
+    def generate():
+        try:
+            for item in tutor.process_message_stream(user_message):
+                # Tokens stream as strings; the final corrections arrive
+                # as a dict event
+                payload = orjson.dumps(item if isinstance(item, dict) else {'token': item}).decode()
+                yield f"data: {payload}\n\n"
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            logger.exception("Error in chat stream: %s", e)
+            payload = orjson.dumps({'error': 'Something went wrong'}).decode()
+            yield f"data: {payload}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+
 @app.route('/api/feedback', methods=['GET'])
 def get_feedback():
     """Get comprehensive feedback on the user's English from the conversation"""
     try:
-        feedback = tutor.get_session_feedback()
+        feedback = get_tutor().get_session_feedback()
         return jsonify(feedback)
     except Exception as e:
-        print(f"Error getting feedback: {e}")
+        logger.exception("Error getting feedback: %s", e)
         return jsonify({
             'error': 'Could not generate feedback',
             'overall_score': 0,
@@ -96,10 +186,24 @@ def get_feedback():
         })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Expose LLM cache hit rates"""
+    from tutor import cache_stats
+
+    grammar_total = cache_stats['grammar_hits'] + cache_stats['grammar_misses']
+    chat_total = cache_stats['chat_hits'] + cache_stats['chat_misses']
+    return jsonify({
+        'cache': dict(cache_stats),
+        'grammar_hit_rate': cache_stats['grammar_hits'] / grammar_total if grammar_total else 0.0,
+        'chat_hit_rate': cache_stats['chat_hits'] / chat_total if chat_total else 0.0
+    })
+
+
 @app.route('/api/clear', methods=['POST'])
 def clear_history():
     """Clear conversation history"""
-    tutor.clear_history()
+    get_tutor().clear_history()
     return jsonify({'status': 'ok'})
 
 
@@ -0,0 +1,152 @@
+# Dynamic micro-batching for grammar-check LLM calls
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import orjson
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# All instructions and the schema live in the system message so every
+# batch shares a byte-identical prompt prefix (provider prefix caches
+# only hit when the leading tokens match exactly); the user message
+# carries nothing but the numbered texts
+BATCH_GRAMMAR_SYSTEM_PROMPT = """You are a grammar checker. The user message contains numbered texts. Analyze each text for grammar errors.
+For each error found, provide the original text, the correction, and a brief explanation.
+
+Respond ONLY with valid JSON in this exact format (no other text):
+{
+    "results": [
+        {
+            "idx": 0,
+            "errors": [
+                {
+                    "original": "the incorrect phrase",
+                    "corrected": "the correct phrase",
+                    "explanation": "brief explanation"
+                }
+            ]
+        }
+    ]
+}
+
+Return one entry in "results" for every input text, in order, using its number as "idx".
+If a text has no errors, return an empty "errors" list for it."""
+
+# Reused for every batch - the system message never changes
+_BATCH_SYS_MSG = {"role": "system", "content": BATCH_GRAMMAR_SYSTEM_PROMPT}
+
+
+class GrammarBatcher:
+    """Coalesces concurrent grammar-check requests into single Groq calls.
+
+    Requests arriving within a small time window are drained into one
+    multi-prompt completion, amortizing the per-call HTTP and prompt
+    overhead under concurrent load. Callers block on a Future and get
+    back their own per-message error list.
+    """
+
+    def __init__(self, api_call, max_batch_size=None, batch_timeout_ms=None):
+        # api_call(messages, temperature, max_tokens) -> Groq completion response
+        self.api_call = api_call
+        self.max_batch_size = max_batch_size or config.LLM_MAX_BATCH_SIZE
+        self.batch_timeout = (batch_timeout_ms or config.LLM_BATCH_TIMEOUT_MS) / 1000.0
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, user_message: str) -> list:
+        """Submit a message for grammar checking and wait for its errors"""
+        future = Future()
+        self.queue.put((user_message, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            # Block for the first item, then drain until the batch is full
+            # or the timeout window closes
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.batch_timeout
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        numbered_messages = "\n".join(
+            f'{i}. "{message}"' for i, (message, _) in enumerate(batch)
+        )
+
+        messages = [
+            _BATCH_SYS_MSG,
+            {"role": "user", "content": numbered_messages}
+        ]
+
+        # Budget output tokens by input size - short messages can't produce
+        # many corrections, and decode latency scales with generated tokens
+        max_tokens = sum(
+            min(500, 64 + 8 * len(message.split())) for message, _ in batch
+        )
+
+        try:
+            # JSON mode constrains the model to emit valid JSON, so no
+            # brace-scanning extraction is needed
+            response = self.api_call(
+                messages,
+                temperature=0.3,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"}
+            )
+        except Exception as e:
+            # Propagate the failure so callers can tell "no errors"
+            # from "couldn't check" - resolving with [] here would let
+            # check_grammar cache a false clean verdict for an hour
+            logger.exception("Batch grammar check error: %s", e)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        results = {}
+        try:
+            parsed = orjson.loads(response.choices[0].message.content)
+            for entry in parsed.get('results', []):
+                results[entry.get('idx')] = entry.get('errors', [])
+        except orjson.JSONDecodeError:
+            pass
+
+        for i, (_, future) in enumerate(batch):
+            future.set_result(results.get(i, []))
+
+
+class FeedbackDispatcher:
+    """Runs end-of-session feedback calls on the shared executor.
+
+    Each feedback request is its own completion, so there is nothing to
+    coalesce; the executor bounds how many run at once and key rotation
+    in the underlying api_call spreads concurrent calls across the key
+    pool.
+    """
+
+    def __init__(self, api_call, executor):
+        # api_call(messages, ...) -> Groq completion response
+        self.api_call = api_call
+        self.executor = executor
+
+    def submit(self, messages, temperature=0.5, max_tokens=1500,
+               response_format=None):
+        """Run a feedback call on the executor and wait for its response"""
+        return self.executor.submit(
+            self.api_call, messages, temperature=temperature,
+            max_tokens=max_tokens, response_format=response_format
+        ).result()
@@ -23,8 +23,15 @@ class Config:
     # AI Model settings
     MODEL_PROVIDER = os.getenv('MODEL_PROVIDER', 'groq')  # groq, openai, anthropic
     MODEL_NAME = os.getenv('MODEL_NAME', 'llama-3.3-70b-versatile')
+    # Smaller/faster model for structured grammar checks; the big model
+    # is reserved for conversational responses
+    GRAMMAR_MODEL_NAME = os.getenv('GRAMMAR_MODEL_NAME', 'llama-3.1-8b-instant')
     MAX_TOKENS = int(os.getenv('MAX_TOKENS', '1000'))
     TEMPERATURE = float(os.getenv('TEMPERATURE', '0.7'))
 
+    # Grammar-check micro-batching
+    LLM_MAX_BATCH_SIZE = int(os.getenv('LLM_MAX_BATCH_SIZE', '8'))
+    LLM_BATCH_TIMEOUT_MS = int(os.getenv('LLM_BATCH_TIMEOUT_MS', '40'))
+
 
 config = Config()
@@ -0,0 +1,16 @@
+# Shared Groq client construction with pooled HTTP connections
+import httpx
+from groq import Groq
+
+# One generous pool per client; HTTP/2 multiplexes concurrent grammar
+# and response calls over a single warm connection, avoiding per-call
+# TCP and TLS handshakes
+_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+
+def build_client(api_key: str) -> Groq:
+    """Build a Groq client backed by a pooled HTTP/2 transport"""
+    return Groq(
+        api_key=api_key,
+        http_client=httpx.Client(http2=True, limits=_LIMITS, timeout=30)
+    )
@@ -0,0 +1,30 @@
+# Non-blocking logging configuration
+import logging
+import logging.handlers
+import queue
+import sys
+
+
+def configure_logging(level=logging.INFO):
+    """Route log records through a queue drained by a background thread.
+
+    Request threads only enqueue records; the listener thread does the
+    blocking stderr write, so bursts of errors (e.g. Groq 429s) don't
+    serialize request handling on stdout contention.
+    """
+    root = logging.getLogger()
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        return  # Already configured
+
+    log_queue = queue.SimpleQueue()
+    stderr_handler = logging.StreamHandler(sys.stderr)
+    stderr_handler.setFormatter(
+        logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
+    )
+
+    listener = logging.handlers.QueueListener(log_queue, stderr_handler)
+    listener.daemon = True
+    listener.start()
+
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
@@ -0,0 +1,156 @@
+# Rule-based grammar pre-filter for common ESL errors
+import re
+
+# Compiled once at import; each rule is (pattern, correction template, explanation).
+# These cover the high-frequency beginner mistakes so most messages never
+# need an LLM round-trip just to be checked.
+_RULES = [
+    # The agreement rules also capture the word before the subject:
+    # after an auxiliary, modal, 'to' or 'let' the bare verb is correct
+    # ('Did he go?', 'Let it go'), so _unless_bare_verb returns the
+    # match unchanged there and check() drops it
+    (
+        re.compile(r"\b(?:([\w']+)\s+)?(he|she|it)\s+(go|do|have|want|like|need|say|know|think|feel)\b", re.IGNORECASE),
+        lambda m: _unless_bare_verb(m, f"{m.group(2)} {_third_person(m.group(3))}"),
+        "Use the third-person singular form of the verb with 'he', 'she', or 'it'."
+    ),
+    (
+        re.compile(r"\b(?:([\w']+)\s+)?(he|she|it)\s+don't\b", re.IGNORECASE),
+        lambda m: _unless_bare_verb(m, f"{m.group(2)} doesn't"),
+        "Use 'doesn't' with 'he', 'she', or 'it'."
+    ),
+    (
+        re.compile(r"\b(I|you|we|they)\s+(is|was)\b", re.IGNORECASE),
+        lambda m: f"{m.group(1)} {_be_form(m.group(1), m.group(2))}",
+        "The verb 'to be' must agree with its subject."
+    ),
+    (
+        re.compile(r"\b(he|she|it)\s+(are|were)\b", re.IGNORECASE),
+        lambda m: f"{m.group(1)} {'is' if m.group(2).lower() == 'are' else 'was'}",
+        "The verb 'to be' must agree with its subject."
+    ),
+    # The classes include the letters whose sound can disagree with
+    # their spelling (silent h, /j/-opening u and eu, /w/-opening o);
+    # _article_for decides by sound and check() drops unchanged matches
+    (
+        re.compile(r"\ba\s+([aeiouh]\w*)\b", re.IGNORECASE),
+        lambda m: f"{_article_for(m.group(1))} {m.group(1)}",
+        "Use 'an' before a word that starts with a vowel sound."
+    ),
+    (
+        re.compile(r"\ban\s+([bcdfghjklmnopqrstuvwxyz]\w*)\b", re.IGNORECASE),
+        lambda m: f"{_article_for(m.group(1))} {m.group(1)}",
+        "Use 'a' before a word that starts with a consonant sound."
+    ),
+    (
+        re.compile(r"\bmore\s+(better|worse|easier|harder|bigger|smaller|faster|slower)\b", re.IGNORECASE),
+        lambda m: m.group(1),
+        "Don't use 'more' with a comparative form - the word is already comparative."
+    ),
+    (
+        re.compile(r"\b(don't|doesn't|didn't|can't|won't)\s+\w+\s+(nothing|nobody|nowhere)\b", re.IGNORECASE),
+        lambda m: m.group(0).replace(m.group(2), _positive_form(m.group(2))),
+        "Avoid double negatives - use 'anything', 'anybody', or 'anywhere' after a negative verb."
+    ),
+    (
+        re.compile(r"\bi\b(?=\s|'|$)"),
+        lambda m: "I",
+        "The pronoun 'I' is always capitalized."
+    ),
+    (
+        re.compile(r"\b(?:([\w']+)\s+)?(everyone|everybody|someone|somebody|anyone|anybody|no one|nobody)\s+(are|were|have)\b", re.IGNORECASE),
+        lambda m: _unless_bare_verb(m, f"{m.group(2)} {_singular_form(m.group(3))}"),
+        "Indefinite pronouns like 'everyone' and 'somebody' take a singular verb."
+    ),
+]
+
+_THIRD_PERSON = {
+    'go': 'goes', 'do': 'does', 'have': 'has', 'want': 'wants',
+    'like': 'likes', 'need': 'needs', 'say': 'says', 'know': 'knows',
+    'think': 'thinks', 'feel': 'feels'
+}
+
+_SINGULAR = {'are': 'is', 'were': 'was', 'have': 'has'}
+
+_POSITIVE = {'nothing': 'anything', 'nobody': 'anybody', 'nowhere': 'anywhere'}
+
+# The a/an choice follows the opening SOUND, not the spelling: 'uni-'
+# and 'eu-' words open with /j/, 'one'/'once' with /w/, while a silent
+# h leaves a vowel sound. Prefixes catch derived forms (university,
+# européen-style loans, honestly, hourly).
+_CONSONANT_SOUND_PREFIXES = ('uni', 'use', 'usu', 'eu', 'ewe', 'one', 'once', 'ufo')
+_VOWEL_SOUND_PREFIXES = ('hour', 'honest', 'honor', 'honour', 'heir')
+
+# Words that license a bare verb after the subject: questions
+# ('Did he go?'), modals ('Can she come?'), infinitives ('to go')
+# and imperatives ('Let it go')
+_BARE_VERB_TRIGGERS = frozenset((
+    'do', 'does', 'did', "don't", "doesn't", "didn't",
+    'will', 'would', 'can', 'could', 'shall', 'should',
+    'may', 'might', 'must', "won't", "wouldn't", "can't",
+    "couldn't", "shouldn't", "mustn't", 'to', 'let', "let's",
+))
+
+
+def _third_person(verb: str) -> str:
+    return _THIRD_PERSON.get(verb.lower(), verb)
+
+
+def _be_form(subject: str, verb: str) -> str:
+    if subject.lower() == 'i':
+        return 'am' if verb.lower() == 'is' else 'was'
+    return 'are' if verb.lower() == 'is' else 'were'
+
+
+def _singular_form(verb: str) -> str:
+    return _SINGULAR.get(verb.lower(), verb)
+
+
+def _positive_form(word: str) -> str:
+    return _POSITIVE.get(word.lower(), word)
+
+
+def _unless_bare_verb(m, corrected: str) -> str:
+    """The correction, unless the word before the subject licenses the
+    bare verb form - then the match comes back unchanged and check()
+    drops it. Group 1 is the optional preceding word.
+    """
+    prev = m.group(1)
+    if prev and prev.lower() in _BARE_VERB_TRIGGERS:
+        return m.group(0)
+    return f'{prev} {corrected}' if prev else corrected
+
+
+def _article_for(word: str) -> str:
+    """The article the word's opening sound calls for ('a' or 'an').
+
+    When this matches what the user wrote, check() sees an unchanged
+    correction and drops the match, so exception words never produce a
+    false correction.
+    """
+    lower = word.lower()
+    if lower.startswith(_VOWEL_SOUND_PREFIXES):
+        return 'an'
+    if lower.startswith(_CONSONANT_SOUND_PREFIXES):
+        return 'a'
+    return 'an' if lower[0] in 'aeiou' else 'a'
+
+
+def check(text: str) -> list:
+    """Run the rule set against a message and return error dicts.
+
+    Results use the same {original, corrected, explanation} shape as the
+    LLM grammar check so callers can use either interchangeably.
+    """
+    errors = []
+    for pattern, correct, explanation in _RULES:
+        for match in pattern.finditer(text):
+            corrected = correct(match)
+            if corrected == match.group(0):
+                continue
+            errors.append({
+                'original': match.group(0),
+                'corrected': corrected,
+                'explanation': explanation
+            })
+    return errors
@@ -1,12 +1,30 @@
 # English Tutor - Direct Groq Integration with API Key Rotation
-import json
+import collections
+import functools
+import hashlib
+import itertools
+import logging
 import os
+import random
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cachetools
+import orjson
 from dotenv import load_dotenv
 from groq import Groq
 
-# Load environment variables
-load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+import rule_checker
+from batcher import FeedbackDispatcher, GrammarBatcher
+from groq_client import build_client
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables (skip the file read when the keys are
+# already in the environment, e.g. on re-import or in production)
+if not os.getenv('GROQ_API_KEY_1') and not os.getenv('GROQ_API_KEY'):
+    load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 
 class APIKeyRotator:
@@ -14,10 +32,7 @@ class APIKeyRotator:
 
     def __init__(self):
         self.keys = []
-        self.current_index = 0
-        self.lock = threading.Lock()
-        self.error_counts = {}
-        self.max_errors = 3  # Max consecutive errors before skipping a key
+        self.cooldown_seconds = 30  # How long a failing key sits out
 
         # Load API keys from environment
         # GROQ_API_KEY_1, GROQ_API_KEY_2, GROQ_API_KEY_3
@@ -25,66 +40,191 @@ class APIKeyRotator:
             key = os.getenv(f'GROQ_API_KEY_{i}', '')
             if key:
                 self.keys.append(key)
-                self.error_counts[i - 1] = 0
 
         # Fallback to single GROQ_API_KEY if no numbered keys
         if not self.keys:
             single_key = os.getenv('GROQ_API_KEY', '')
             if single_key:
                 self.keys.append(single_key)
-                self.error_counts[0] = 0
 
-        print(f"API Key Rotator initialized with {len(self.keys)} key(s)")
+        # Per-key wake times: a key that errors sits out until its
+        # cooldown expires, then rejoins the rotation automatically -
+        # no counters to saturate and no hard reset needed
+        self.cooldown = [0.0] * len(self.keys)
+
+        # One pooled client per key, built up front: client construction
+        # sets up a fresh httpx pool and TLS context, and building it per
+        # call would throw away the warm HTTP/2 connections
+        self.clients = [build_client(key) for key in self.keys]
+
+        # Round-robin selection rides a single itertools.count - next()
+        # is one atomic C-level step under the GIL, so the per-request
+        # hot path takes no lock
+        self._counter = itertools.count()
+
+        logger.info("API Key Rotator initialized with %d key(s)", len(self.keys))
+
+    def next_client(self):
+        """Pick the next key round-robin; returns (index, client).
+
+        Keys in cooldown are skipped and recover by themselves when
+        their wake time passes. If every key is cooling down, the one
+        waking soonest is used rather than failing outright.
+        """
+        now = time.monotonic()
+        for _ in range(len(self.keys)):
+            idx = next(self._counter) % len(self.keys)
+            if self.cooldown[idx] <= now:
+                return idx, self.clients[idx]
+
+        idx = min(range(len(self.keys)), key=self.cooldown.__getitem__)
+        return idx, self.clients[idx]
+
+    def mark_result(self, index: int, had_error: bool):
+        """Record the outcome of a call made with the given key"""
+        if had_error:
+            # Single float store - atomic under the GIL, no lock needed
+            self.cooldown[index] = time.monotonic() + self.cooldown_seconds
+        elif self.cooldown[index]:
+            self.cooldown[index] = 0.0
 
-    def get_current_key(self) -> str:
-        """Get the current API key"""
-        if not self.keys:
-            return ''
+    def get_key_count(self) -> int:
+        """Return number of available keys"""
+        return len(self.keys)
 
-        with self.lock:
-            return self.keys[self.current_index]
 
-    def rotate_key(self, had_error: bool = False):
-        """Rotate to the next API key"""
-        if len(self.keys) <= 1:
-            return
+@functools.lru_cache(maxsize=1)
+def get_rotator() -> APIKeyRotator:
+    """Return the process-wide rotator, constructing it exactly once.
 
-        with self.lock:
-            if had_error:
-                self.error_counts[self.current_index] += 1
-            else:
-                # Reset error count on success
-                self.error_counts[self.current_index] = 0
+    The lru_cache guard means any future import path or helper that
+    asks for a rotator shares this instance (and its warm HTTP pools)
+    instead of building a second key/client set.
+    """
+    return APIKeyRotator()
 
-            # Find next available key
-            attempts = 0
-            while attempts < len(self.keys):
-                self.current_index = (self.current_index + 1) % len(self.keys)
 
-                # Skip keys with too many errors
-                if self.error_counts[self.current_index] < self.max_errors:
-                    break
-                attempts += 1
+# Global API key rotator instance
+api_rotator = get_rotator()
+
+# Default model used for conversational completions
+DEFAULT_MODEL = os.getenv('MODEL_NAME', 'llama-3.3-70b-versatile')
+
+# Grammar checking is a structured JSON classification task - a small
+# fast model handles it at a fraction of the 70B model's latency
+GRAMMAR_MODEL = os.getenv('GRAMMAR_MODEL_NAME', 'llama-3.1-8b-instant')
+
+
+# Cap concurrent in-flight completions so a traffic burst can't blow
+# through the per-key rate limits all at once
+LLM_CONCURRENCY_PER_KEY = int(os.getenv('LLM_CONCURRENCY_PER_KEY', '4'))
+_inflight = threading.BoundedSemaphore(
+    max(1, api_rotator.get_key_count()) * LLM_CONCURRENCY_PER_KEY
+)
+
+
+# Opt-in cache of raw completions keyed by the exact request, so byte-
+# identical calls (same messages, model and sampling params) skip the
+# network entirely. Off by default: cached replies repeat verbatim,
+# which can read robotic in open-ended chat.
+ENABLE_RESPONSE_CACHE = os.getenv('ENABLE_RESPONSE_CACHE', '0') == '1'
+_response_cache = cachetools.TTLCache(maxsize=2048, ttl=3600)
+_response_cache_lock = threading.Lock()
+
+
+def _response_cache_key(model, messages, temperature, max_tokens, response_format):
+    digest = hashlib.sha256(
+        orjson.dumps(messages, option=orjson.OPT_SORT_KEYS)
+    ).digest()
+    fmt = response_format['type'] if response_format else None
+    return (digest, model, temperature, max_tokens, fmt)
+
+
+def call_with_rotation(rotator, model, messages, temperature=0.7, max_tokens=500,
+                       response_format=None, stream=False):
+    """Make API call with automatic retry and key rotation.
+
+    With stream=True the raw chunk iterator is returned; key rotation
+    covers stream creation, but a failure mid-iteration is the caller's
+    to handle since tokens may already have been delivered.
+    """
+    if ENABLE_RESPONSE_CACHE and not stream:
+        cache_key = _response_cache_key(
+            model, messages, temperature, max_tokens, response_format
+        )
+        with _response_cache_lock:
+            cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    max_retries = rotator.get_key_count()
+    last_error = None
+
+    kwargs = {}
+    if response_format is not None:
+        kwargs['response_format'] = response_format
+    if stream:
+        kwargs['stream'] = True
+
+    for attempt in range(max_retries):
+        idx, client = rotator.next_client()
+        try:
+            with _inflight:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **kwargs
+                )
+            rotator.mark_result(idx, had_error=False)
+            # Only complete responses are worth replaying - a truncated
+            # (length-capped) answer shouldn't be served twice
+            if (ENABLE_RESPONSE_CACHE and not stream
+                    and response.choices[0].finish_reason == 'stop'):
+                with _response_cache_lock:
+                    _response_cache[cache_key] = response
+            return response
+        except Exception as e:
+            last_error = e
+            logger.warning("API call failed with key %d: %s", idx + 1, e)
+            rotator.mark_result(idx, had_error=True)
 
-            # If all keys have errors, reset error counts and use first key
-            if attempts >= len(self.keys):
-                for i in range(len(self.keys)):
-                    self.error_counts[i] = 0
-                self.current_index = 0
+    raise last_error if last_error else Exception("All API keys failed")
 
-            print(f"Rotated to API key {self.current_index + 1}")
 
-    def get_client(self) -> Groq:
-        """Get a Groq client with current key"""
-        return Groq(api_key=self.get_current_key())
+# Shared batcher so concurrent grammar checks coalesce into one Groq call
+grammar_batcher = GrammarBatcher(
+    api_call=functools.partial(call_with_rotation, api_rotator, GRAMMAR_MODEL)
+)
 
-    def get_key_count(self) -> int:
-        """Return number of available keys"""
-        return len(self.keys)
+# Shared executor for overlapping the grammar check with response generation
+llm_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='llm')
 
+# Session feedback is latency-tolerant, so pool concurrent feedback
+# requests and fire them together across the key pool
+feedback_dispatcher = FeedbackDispatcher(
+    api_call=functools.partial(call_with_rotation, api_rotator, DEFAULT_MODEL),
+    executor=llm_executor
+)
+
+# Short conversational messages follow a heavily skewed distribution
+# ("hello", "how are you", ...), so cache LLM results by message hash.
+# Module-level so all tutor instances share one cache.
+_grammar_cache = cachetools.TTLCache(maxsize=10_000, ttl=3600)
+_chat_cache = cachetools.TTLCache(maxsize=10_000, ttl=3600)
+_cache_lock = threading.Lock()
+
+cache_stats = {
+    'grammar_hits': 0,
+    'grammar_misses': 0,
+    'chat_hits': 0,
+    'chat_misses': 0
+}
 
-# Global API key rotator instance
-api_rotator = APIKeyRotator()
+
+def _message_hash(text: str) -> str:
+    return hashlib.sha256(text.strip().lower().encode()).hexdigest()
 
 # Natural conversation prompt - like chatting with a native English speaking friend
 CHAT_SYSTEM_PROMPT = """You are a casual, friendly person chatting with a friend. Talk naturally like a real native English speaker in daily life.
@@ -118,109 +258,302 @@ Examples of natural responses:
 
 Just be a chill, friendly person having a normal chat."""
 
-GRAMMAR_CHECK_PROMPT = """Analyze the following text for grammar errors.
-For each error found, provide the original text, the correction, and a brief explanation.
-
-Text: {user_message}
+# Single-call variant: same casual persona, but the model also returns
+# grammar corrections in the same JSON object, so one round-trip covers
+# both tasks instead of two sequential calls
+COMBINED_CHAT_PROMPT = CHAT_SYSTEM_PROMPT + """
 
-Respond ONLY with valid JSON in this exact format (no other text):
-{{
-    "errors": [
-        {{
+For this conversation, respond ONLY with valid JSON in this exact format:
+{
+    "reply": "your casual chat reply, following all the style rules above",
+    "corrections": [
+        {
             "original": "the incorrect phrase",
             "corrected": "the correct phrase",
             "explanation": "brief explanation"
-        }}
-    ],
-    "is_correct": true or false
-}}
-
-If there are no errors, return: {{"errors": [], "is_correct": true}}"""
+        }
+    ]
+}
 
-SESSION_FEEDBACK_PROMPT = """Analyze the following conversation messages from an English learner and provide comprehensive feedback.
+List every grammar error from the user's last message in "corrections".
+If there are no errors, return an empty "corrections" list.
+Never mention the corrections inside "reply"."""
 
-User messages:
-{user_messages}
+# All static instructions sit in the system message so every feedback
+# call shares a byte-identical prompt prefix (provider prefix caches
+# only hit on exactly matching leading tokens); the user message holds
+# nothing but the numbered learner messages
+SESSION_FEEDBACK_PROMPT = """You are an expert English language analyst. The user message contains numbered conversation messages from an English learner. Analyze them and provide comprehensive feedback.
 
 Provide detailed feedback in the following JSON format:
-{{
+{
     "overall_score": 1-10,
     "grammar_errors": [
-        {{
+        {
             "original": "what they said",
             "corrected": "correct version",
             "explanation": "why this is wrong",
             "message_number": 1
-        }}
+        }
     ],
     "vocabulary_suggestions": [
-        {{
+        {
             "original": "basic word/phrase used",
             "better_alternatives": ["better option 1", "better option 2"],
             "context": "when to use these"
-        }}
+        }
     ],
     "strengths": ["list of things they did well"],
     "areas_to_improve": ["specific areas to work on"],
     "tips": ["actionable tips for improvement"],
     "encouragement": "a positive, encouraging message"
-}}
+}
+
+Be thorough but constructive. Focus on patterns, not just individual errors.
+Respond ONLY with valid JSON."""
+
+
+
+# Trivially-short messages are common in chat UIs and don't need an LLM
+# round-trip - answer them from a small canned pool
+_GREETING_WORDS = {'hi', 'hello', 'hey', 'yo'}
+_ACK_WORDS = {'ok', 'okay', 'yes', 'no', 'yeah', 'nah'}
 
-Be thorough but constructive. Focus on patterns, not just individual errors."""
+_GREETING_REPLIES = [
+    "Hey! How's it going?",
+    "Hi there! What's up?",
+    "Hey hey! How's your day been?",
+]
+_ACK_REPLIES = [
+    "Gotcha. So what else is going on?",
+    "Haha okay. Tell me more!",
+    "Alright! What have you been up to?",
+]
+_TOO_SHORT_REPLIES = [
+    "Hmm, that was short! Tell me a bit more?",
+    "Wait, say more! What do you mean?",
+    "Go on, give me the full story!",
+]
+
+
+# System messages are immutable - build the dict objects once at import
+# and reuse them in every prompt instead of allocating per call
+_CHAT_SYS_MSG = {"role": "system", "content": CHAT_SYSTEM_PROMPT}
+_COMBINED_SYS_MSG = {"role": "system", "content": COMBINED_CHAT_PROMPT}
+_FEEDBACK_SYS_MSG = {"role": "system", "content": SESSION_FEEDBACK_PROMPT}
 
 
 class EnglishTutor:
     def __init__(self):
-        self.rotator = api_rotator
-        self.model = os.getenv('MODEL_NAME', 'llama-3.3-70b-versatile')
-        self.conversation_history = []
-        self.user_messages_log = []  # Store user messages for feedback
+        self.rotator = get_rotator()
+        self.model = DEFAULT_MODEL
         self.max_history = 20
-
-    def _make_api_call(self, messages, temperature=0.7, max_tokens=500):
+        # Bounded deque: O(1) appends and no truncation copies per turn
+        self.conversation_history = collections.deque(maxlen=self.max_history)
+        # Bounded ring buffers: a marathon session keeps the most recent
+        # 200 messages instead of growing without limit
+        self.user_messages_log = collections.deque(maxlen=200)
+        # Feedback-prompt lines, formatted once as messages arrive instead
+        # of re-formatting the whole log on every feedback call
+        self._formatted_log = collections.deque(maxlen=200)
+        # Lifetime count survives the ring buffers dropping old entries
+        self._message_count = 0
+
+    def _make_api_call(self, messages, temperature=0.7, max_tokens=500,
+                       response_format=None, stream=False):
         """Make API call with automatic retry and key rotation"""
-        max_retries = self.rotator.get_key_count()
-        last_error = None
-
-        for attempt in range(max_retries):
-            try:
-                client = self.rotator.get_client()
-                response = client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                # Success - rotate for next request (load balancing)
-                if attempt == 0:
-                    self.rotator.rotate_key(had_error=False)
-                return response
-            except Exception as e:
-                last_error = e
-                print(f"API call failed with key {self.rotator.current_index + 1}: {e}")
-                self.rotator.rotate_key(had_error=True)
+        return call_with_rotation(
+            self.rotator, self.model, messages,
+            temperature=temperature, max_tokens=max_tokens,
+            response_format=response_format, stream=stream
+        )
+
+    def _trivial_reply(self, user_message: str):
+        """Return a canned reply for trivially-short messages, else None"""
+        normalized = user_message.strip().lower().rstrip('!.?,')
+        if normalized in _GREETING_WORDS:
+            return random.choice(_GREETING_REPLIES)
+        if normalized in _ACK_WORDS:
+            return random.choice(_ACK_REPLIES)
+        if len(normalized) < 2:
+            return random.choice(_TOO_SHORT_REPLIES)
+        return None
+
+    def check_grammar_local(self, user_message: str):
+        """Resolve grammar without an LLM call where possible.
+
+        Returns an error list when the rule engine, message length, or
+        cache settles the question locally, or None when only the LLM
+        can answer.
+        """
+        # The local rule engine catches common ESL mistakes for free; only
+        # non-trivial messages it can't fault go to the LLM
+        rule_errors = rule_checker.check(user_message)
+        if rule_errors or len(user_message.split()) < 6:
+            return rule_errors
+
+        with _cache_lock:
+            cached = _grammar_cache.get(_message_hash(user_message))
+        if cached is not None:
+            cache_stats['grammar_hits'] += 1
+            return cached
+        return None
+
+    def check_grammar(self, user_message: str) -> list:
+        """Check a message for grammar errors, rules first, LLM as fallback"""
+        local = self.check_grammar_local(user_message)
+        if local is not None:
+            return local
+
+        key = _message_hash(user_message)
+        cache_stats['grammar_misses'] += 1
 
-        raise last_error if last_error else Exception("All API keys failed")
+        try:
+            errors = grammar_batcher.submit(user_message)
+        except Exception as e:
+            logger.exception("Grammar check error: %s", e)
+            return []
+
+        with _cache_lock:
+            _grammar_cache[key] = errors
+        return errors
+
+    def _history_tail(self, count: int = 10, max_chars: int = 4000) -> list:
+        """Return recent history bounded by message count and char budget.
+
+        Character length is a cheap proxy for tokens: ten long replies
+        can cost several times what ten short ones do, so the tail is
+        trimmed from the oldest end once the budget is spent. The frozen
+        system prompt stays the byte-stable prompt prefix regardless.
+        """
+        selected = []
+        chars = 0
+        for message in reversed(self.conversation_history):
+            if len(selected) >= count:
+                break
+            chars += len(message["content"])
+            if chars > max_chars and selected:
+                break
+            selected.append(message)
+        selected.reverse()
+        return selected
 
     def generate_chat_response(self, user_message: str) -> str:
         """Generate natural chat response like a native speaker"""
-        messages = [{"role": "system", "content": CHAT_SYSTEM_PROMPT}]
-
         # Include recent conversation history for context
-        for msg in self.conversation_history[-10:]:
-            messages.append(msg)
-
-        messages.append({"role": "user", "content": user_message})
+        history = self._history_tail()
+        messages = [_CHAT_SYS_MSG, *history,
+                    {"role": "user", "content": user_message}]
+
+        # Cache on both the history tail and the message, so identical
+        # exchanges (e.g. a fresh session saying "hello") skip the LLM
+        history_hash = hashlib.sha256(orjson.dumps(history)).hexdigest()
+        key = (history_hash, _message_hash(user_message))
+        with _cache_lock:
+            cached = _chat_cache.get(key)
+        if cached is not None:
+            cache_stats['chat_hits'] += 1
+            return cached
+        cache_stats['chat_misses'] += 1
 
         try:
             # Higher temperature for more natural/varied responses
             # Lower max_tokens to encourage shorter, chat-like responses
             response = self._make_api_call(messages, temperature=0.9, max_tokens=150)
-            return response.choices[0].message.content.strip()
+            reply = response.choices[0].message.content.strip()
         except Exception as e:
-            print(f"Response generation error: {e}")
+            logger.exception("Response generation error: %s", e)
             return "Oh sorry, something went wrong. Can you say that again?"
 
+        with _cache_lock:
+            _chat_cache[key] = reply
+        return reply
+
+    def generate_combined_response(self, user_message: str):
+        """Generate the chat reply and grammar corrections in one call.
+
+        Returns a (reply, corrections) tuple. Falls back to a plain chat
+        response with no corrections if the combined call fails.
+        """
+        history = self._history_tail()
+        messages = [_COMBINED_SYS_MSG, *history,
+                    {"role": "user", "content": user_message}]
+
+        try:
+            response = self._make_api_call(
+                messages, temperature=0.9, max_tokens=300,
+                response_format={"type": "json_object"}
+            )
+            parsed = orjson.loads(response.choices[0].message.content)
+            reply = (parsed.get('reply') or '').strip()
+            corrections = parsed.get('corrections', [])
+            if reply:
+                with _cache_lock:
+                    _grammar_cache[_message_hash(user_message)] = corrections
+                return reply, corrections
+        except Exception as e:
+            logger.exception("Combined response error: %s", e)
+
+        return self.generate_chat_response(user_message), []
+
+    def generate_chat_response_stream(self, user_message: str):
+        """Yield chat response tokens as they arrive from Groq"""
+        messages = [_CHAT_SYS_MSG, *self._history_tail(),
+                    {"role": "user", "content": user_message}]
+
+        try:
+            # Retry/rotation covers stream creation; once tokens flow a
+            # mid-stream failure falls through to the apology below
+            stream = self._make_api_call(
+                messages, temperature=0.9, max_tokens=150, stream=True
+            )
+            for chunk in stream:
+                token = chunk.choices[0].delta.content
+                if token:
+                    yield token
+        except Exception as e:
+            logger.exception("Streaming response error: %s", e)
+            yield "Oh sorry, something went wrong. Can you say that again?"
+
+    def process_message_stream(self, user_message: str):
+        """Process a user message, yielding response tokens as they arrive.
+
+        Yields response tokens (str) followed by one final dict carrying
+        the grammar corrections, which are computed concurrently while
+        the response streams. Tokens are buffered server-side so the full
+        reply still lands in the conversation history.
+        """
+        self.conversation_history.append({"role": "user", "content": user_message})
+        self.user_messages_log.append(user_message)
+        self._message_count += 1
+        self._formatted_log.append(f'{self._message_count}. "{user_message}"')
+
+        canned = self._trivial_reply(user_message)
+        if canned is not None:
+            yield canned
+            yield {'corrections': []}
+            self.conversation_history.append({"role": "assistant", "content": canned})
+            return
+
+        # The grammar check runs while the response streams, so it adds
+        # no wall-clock time on top of generation
+        grammar_future = llm_executor.submit(self.check_grammar, user_message)
+
+        tokens = []
+        for token in self.generate_chat_response_stream(user_message):
+            tokens.append(token)
+            yield token
+
+        try:
+            corrections = grammar_future.result()
+        except Exception as e:
+            logger.exception("Grammar check error: %s", e)
+            corrections = []
+        yield {'corrections': corrections}
+
+        ai_response = ''.join(tokens).strip()
+        self.conversation_history.append({"role": "assistant", "content": ai_response})
+
     def process_message(self, user_message: str) -> dict:
         """Process a user message - natural chat conversation"""
         # Add to history
@@ -228,25 +561,35 @@ class EnglishTutor:
 
         # Log user message for feedback later
         self.user_messages_log.append(user_message)
-
-        # Generate natural conversation response
-        ai_response = self.generate_chat_response(user_message)
+        self._message_count += 1
+        self._formatted_log.append(f'{self._message_count}. "{user_message}"')
+
+        # Canned fast path first, then: when the rules/cache settle the
+        # grammar question one plain chat call suffices; otherwise fuse
+        # grammar check and reply into a single combined call
+        canned = self._trivial_reply(user_message)
+        if canned is not None:
+            ai_response = canned
+            corrections = []
+        else:
+            corrections = self.check_grammar_local(user_message)
+            if corrections is not None:
+                ai_response = self.generate_chat_response(user_message)
+            else:
+                cache_stats['grammar_misses'] += 1
+                ai_response, corrections = self.generate_combined_response(user_message)
 
         result = {
             'message': ai_response,
-            'corrections': [],
+            'corrections': corrections,
             'feedback': {},
             'mode': 'chat',
-            'messages_count': len(self.user_messages_log)
+            'messages_count': self._message_count
         }
 
-        # Add AI response to history
+        # Add AI response to history (the deque drops the oldest entries)
         self.conversation_history.append({"role": "assistant", "content": ai_response})
 
-        # Trim history
-        if len(self.conversation_history) > self.max_history:
-            self.conversation_history = self.conversation_history[-self.max_history:]
-
         return result
 
     def get_session_feedback(self) -> dict:
@@ -263,42 +606,42 @@ class EnglishTutor:
                 'encouragement': 'Start chatting to get feedback!'
             }
 
-        # Format user messages for analysis
-        user_messages_text = "\n".join([
-            f"{i+1}. \"{msg}\""
-            for i, msg in enumerate(self.user_messages_log)
-        ])
+        # Lines were formatted as messages arrived; for long sessions send
+        # 50 evenly-spaced samples so feedback still covers the whole
+        # session rather than just its tail
+        lines = list(self._formatted_log)
+        if len(lines) > 50:
+            # Snapshot first: indexing a deque is O(n) per access, a list
+            # is O(1), so sampling costs one pass instead of fifty
+            step = len(lines) / 50
+            lines = [lines[int(i * step)] for i in range(50)]
+        user_messages_text = "\n".join(lines)
 
         try:
             messages = [
-                {
-                    "role": "system",
-                    "content": "You are an expert English language analyst. Provide detailed, constructive feedback. Respond ONLY with valid JSON."
-                },
-                {
-                    "role": "user",
-                    "content": SESSION_FEEDBACK_PROMPT.format(user_messages=user_messages_text)
-                }
+                _FEEDBACK_SYS_MSG,
+                {"role": "user", "content": user_messages_text}
             ]
-            response = self._make_api_call(messages, temperature=0.5, max_tokens=1500)
-
-            result_text = response.choices[0].message.content.strip()
-
-            # Parse JSON
+            # Scale the output budget with session length - a short session
+            # can't fill 1500 tokens of feedback and decode time is paid
+            # per generated token
+            max_tokens = min(1500, 300 + 60 * len(self.user_messages_log))
+            response = feedback_dispatcher.submit(
+                messages, temperature=0.5, max_tokens=max_tokens,
+                response_format={"type": "json_object"}
+            )
+
+            # JSON mode guarantees valid JSON - parse it directly
             try:
-                start_idx = result_text.find('{')
-                end_idx = result_text.rfind('}') + 1
-                if start_idx != -1 and end_idx > start_idx:
-                    json_str = result_text[start_idx:end_idx]
-                    feedback = json.loads(json_str)
-                    feedback['total_messages'] = len(self.user_messages_log)
-                    feedback['user_messages'] = self.user_messages_log
-                    return feedback
-            except json.JSONDecodeError:
+                feedback = orjson.loads(response.choices[0].message.content)
+                feedback['total_messages'] = self._message_count
+                feedback['user_messages'] = list(self.user_messages_log)
+                return feedback
+            except orjson.JSONDecodeError:
                 pass
 
         except Exception as e:
-            print(f"Session feedback error: {e}")
+            logger.exception("Session feedback error: %s", e)
 
         return {
             'error': 'Could not generate feedback',
@@ -313,5 +656,7 @@ class EnglishTutor:
 
     def clear_history(self):
         """Clear conversation history and logs"""
-        self.conversation_history = []
-        self.user_messages_log = []
+        self.conversation_history.clear()
+        self.user_messages_log.clear()
+        self._formatted_log.clear()
+        self._message_count = 0
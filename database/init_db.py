@@ -2,95 +2,97 @@
 import sqlite3
 import os
 
+# All DDL in one script so SQLite parses it in a single pass. The FK
+# indexes matter more than the tables: without them the per-user and
+# per-session lookup queries degrade to full table scans as the
+# conversations and grammar_errors tables grow.
+SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE,
+        level TEXT DEFAULT 'intermediate',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
 
-def init_database(db_path: str = 'tutor.db'):
-    """Initialize the SQLite database with required tables"""
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ended_at TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    CREATE TABLE IF NOT EXISTS conversations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id INTEGER,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (session_id) REFERENCES sessions (id)
+    );
+
+    CREATE TABLE IF NOT EXISTS grammar_errors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        conversation_id INTEGER,
+        original_text TEXT NOT NULL,
+        corrected_text TEXT NOT NULL,
+        error_type TEXT,
+        explanation TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (conversation_id) REFERENCES conversations (id)
+    );
 
-    # Users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            email TEXT UNIQUE,
-            level TEXT DEFAULT 'intermediate',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    CREATE TABLE IF NOT EXISTS user_progress (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER UNIQUE,
+        total_sessions INTEGER DEFAULT 0,
+        total_messages INTEGER DEFAULT 0,
+        errors_corrected INTEGER DEFAULT 0,
+        vocabulary_learned INTEGER DEFAULT 0,
+        current_streak INTEGER DEFAULT 0,
+        longest_streak INTEGER DEFAULT 0,
+        last_practice_date DATE,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
 
-    # Sessions table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            ended_at TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
+    CREATE TABLE IF NOT EXISTS vocabulary (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        word TEXT NOT NULL,
+        definition TEXT,
+        example_sentence TEXT,
+        mastery_level INTEGER DEFAULT 0,
+        last_reviewed TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    );
 
-    # Conversations table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS conversations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER,
-            role TEXT NOT NULL,
-            content TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (session_id) REFERENCES sessions (id)
-        )
-    ''')
+    CREATE INDEX IF NOT EXISTS idx_conversations_session ON conversations(session_id);
+    CREATE INDEX IF NOT EXISTS idx_grammar_errors_user ON grammar_errors(user_id);
+    CREATE INDEX IF NOT EXISTS idx_vocabulary_user ON vocabulary(user_id);
+'''
 
-    # Grammar errors table (for tracking progress)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS grammar_errors (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            conversation_id INTEGER,
-            original_text TEXT NOT NULL,
-            corrected_text TEXT NOT NULL,
-            error_type TEXT,
-            explanation TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (conversation_id) REFERENCES conversations (id)
-        )
-    ''')
 
-    # User progress table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_progress (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER UNIQUE,
-            total_sessions INTEGER DEFAULT 0,
-            total_messages INTEGER DEFAULT 0,
-            errors_corrected INTEGER DEFAULT 0,
-            vocabulary_learned INTEGER DEFAULT 0,
-            current_streak INTEGER DEFAULT 0,
-            longest_streak INTEGER DEFAULT 0,
-            last_practice_date DATE,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
+def init_database(db_path: str = 'tutor.db'):
+    """Initialize the SQLite database with required tables"""
+
+    conn = sqlite3.connect(db_path)
 
-    # Vocabulary table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS vocabulary (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            word TEXT NOT NULL,
-            definition TEXT,
-            example_sentence TEXT,
-            mastery_level INTEGER DEFAULT 0,
-            last_reviewed TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
+    # WAL lets readers run concurrently with a writer, and
+    # synchronous=NORMAL skips the per-commit fsync (safe under WAL) -
+    # together these dominate SQLite write throughput far more than any
+    # DDL choice. journal_mode is persistent; the others are set per
+    # connection, so app connections should apply them too.
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    conn.execute('PRAGMA temp_store=MEMORY')
 
+    conn.executescript(SCHEMA_SQL)
     conn.commit()
     conn.close()
 
@@ -1,117 +1,275 @@
 # Database models for PostgreSQL using SQLAlchemy
 import os
-from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Date, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-
-Base = declarative_base()
+import threading
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy import create_engine, event, func, insert, inspect, select, text, update, BigInteger, CheckConstraint, Index, Integer, LargeBinary, SmallInteger, String, Text, TypeDecorator, DateTime, Date, ForeignKey
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker
+
+
+class Base(DeclarativeBase):
+    pass
+
+# Conversations and grammar errors accrue per chat turn; a 32-bit id
+# overflows at 2.1B rows. SQLite's rowid magic needs plain INTEGER for
+# autoincrement, so the variant keeps local dev working.
+_BigIntPK = BigInteger().with_variant(Integer, 'sqlite')
+
+# zstd is optional - without it (or below the size threshold) text is
+# stored as plain UTF-8 bytes, and reads tell the two apart by the
+# zstd frame magic, which is never valid UTF-8
+try:
+    import zstandard
+    _ZSTD_COMPRESSOR = zstandard.ZstdCompressor(level=3)
+    _ZSTD_DECOMPRESSOR = zstandard.ZstdDecompressor()
+except ImportError:
+    zstandard = None
+
+
+class ZstdText(TypeDecorator):
+    """Text column compressed client-side with zstd above a threshold.
+
+    Long tutor replies repeat structure and compress several-fold;
+    compressing before the wire cuts heap, WAL and network bytes in
+    one move. Short values skip compression since the frame overhead
+    would outweigh the savings.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    MIN_COMPRESS_SIZE = 256
+    _MAGIC = b'\x28\xb5\x2f\xfd'  # zstd frame header
+
+    @staticmethod
+    def encode(value):
+        """str -> stored bytes; shared with raw-SQL call sites"""
+        if value is None:
+            return None
+        data = value.encode('utf-8')
+        if zstandard is None or len(data) < ZstdText.MIN_COMPRESS_SIZE:
+            return data
+        compressed = _ZSTD_COMPRESSOR.compress(data)
+        # Incompressible content (rare for prose) stays plain
+        return compressed if len(compressed) < len(data) else data
+
+    @staticmethod
+    def decode(value):
+        """Stored bytes -> str; tolerates already-decoded values"""
+        if value is None or isinstance(value, str):
+            return value
+        data = bytes(value)
+        if zstandard is not None and data[:4] == ZstdText._MAGIC:
+            return _ZSTD_DECOMPRESSOR.decompress(data).decode('utf-8')
+        return data.decode('utf-8')
+
+    def process_bind_param(self, value, dialect):
+        return self.encode(value)
+
+    def process_result_value(self, value, dialect):
+        return self.decode(value)
 
 
 class User(Base):
     __tablename__ = 'users'
-
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    username = Column(String(100), unique=True, nullable=False)
-    email = Column(String(255), unique=True)
-    level = Column(String(50), default='intermediate')
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-
-    sessions = relationship('Session', back_populates='user')
-    progress = relationship('UserProgress', back_populates='user', uselist=False)
-    vocabulary = relationship('Vocabulary', back_populates='user')
-    grammar_errors = relationship('GrammarError', back_populates='user')
+    # TEXT + CHECK instead of a sized varchar: PG stores both
+    # identically, and the constraint documents (and enforces) the
+    # closed value set without a lookup-table join
+    __table_args__ = (
+        CheckConstraint("level IN ('beginner', 'intermediate', 'advanced')",
+                        name='ck_users_level'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    username: Mapped[str] = mapped_column(String(100), unique=True)
+    email: Mapped[Optional[str]] = mapped_column(String(255), unique=True)
+    level: Mapped[Optional[str]] = mapped_column(Text, default='intermediate')
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    # Implicit relationship access raises instead of silently issuing
+    # per-parent SELECTs (the N+1 pattern) or dragging whole
+    # collections into queries that never read them; a query that
+    # genuinely needs one opts in with selectinload()/joinedload()
+    sessions: Mapped[List['Session']] = relationship(back_populates='user',
+                                                     lazy='raise')
+    progress: Mapped[Optional['UserProgress']] = relationship(back_populates='user',
+                                                              lazy='raise')
+    vocabulary: Mapped[List['Vocabulary']] = relationship(back_populates='user',
+                                                          lazy='raise')
+    grammar_errors: Mapped[List['GrammarError']] = relationship(back_populates='user',
+                                                                lazy='raise')
 
 
 class Session(Base):
     __tablename__ = 'sessions'
+    __table_args__ = (
+        CheckConstraint("mode IN ('tutor', 'chat')", name='ck_sessions_mode'),
+    )
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
-    mode = Column(String(20), default='tutor')
-    started_at = Column(DateTime, default=datetime.utcnow)
-    ended_at = Column(DateTime)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey('users.id'), index=True)
+    mode: Mapped[Optional[str]] = mapped_column(Text, default='tutor')
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
+    ended_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
 
-    user = relationship('User', back_populates='sessions')
-    conversations = relationship('Conversation', back_populates='session')
+    user: Mapped[Optional['User']] = relationship(back_populates='sessions')
+    conversations: Mapped[List['Conversation']] = relationship(back_populates='session',
+                                                               lazy='raise')
 
 
 class Conversation(Base):
     __tablename__ = 'conversations'
-
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    session_id = Column(Integer, ForeignKey('sessions.id'))
-    role = Column(String(20), nullable=False)
-    content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-    session = relationship('Session', back_populates='conversations')
-    grammar_errors = relationship('GrammarError', back_populates='conversation')
+    # Serves "tail of a chat" (WHERE session_id = ? ORDER BY created_at)
+    # straight from the index
+    __table_args__ = (
+        Index('ix_conv_session_created', 'session_id', 'created_at'),
+        CheckConstraint("role IN ('user', 'assistant', 'system')",
+                        name='ck_conversations_role'),
+    )
+
+    id: Mapped[int] = mapped_column(_BigIntPK, primary_key=True, autoincrement=True)
+    # No single-column index: the composite above leads on session_id
+    # and serves equality lookups on it just as well
+    session_id: Mapped[Optional[int]] = mapped_column(ForeignKey('sessions.id'))
+    role: Mapped[str] = mapped_column(Text)
+    content: Mapped[str] = mapped_column(ZstdText())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
+
+    session: Mapped[Optional['Session']] = relationship(back_populates='conversations')
+    grammar_errors: Mapped[List['GrammarError']] = relationship(back_populates='conversation',
+                                                                lazy='raise')
 
 
 class GrammarError(Base):
     __tablename__ = 'grammar_errors'
-
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
-    conversation_id = Column(Integer, ForeignKey('conversations.id'))
-    original_text = Column(Text, nullable=False)
-    corrected_text = Column(Text, nullable=False)
-    error_type = Column(String(100))
-    explanation = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-    user = relationship('User', back_populates='grammar_errors')
-    conversation = relationship('Conversation', back_populates='grammar_errors')
+    # Per-user error history, newest first
+    __table_args__ = (
+        Index('ix_grammar_user_created', 'user_id', 'created_at'),
+    )
+
+    id: Mapped[int] = mapped_column(_BigIntPK, primary_key=True, autoincrement=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey('users.id'))
+    conversation_id: Mapped[Optional[int]] = mapped_column(_BigIntPK,
+                                                           ForeignKey('conversations.id'),
+                                                           index=True)
+    original_text: Mapped[str] = mapped_column(Text)
+    corrected_text: Mapped[str] = mapped_column(Text)
+    error_type: Mapped[Optional[str]] = mapped_column(Text)
+    explanation: Mapped[Optional[str]] = mapped_column(ZstdText())
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
+
+    user: Mapped[Optional['User']] = relationship(back_populates='grammar_errors')
+    conversation: Mapped[Optional['Conversation']] = relationship(back_populates='grammar_errors')
 
 
 class UserProgress(Base):
     __tablename__ = 'user_progress'
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.id'), unique=True)
-    total_sessions = Column(Integer, default=0)
-    total_messages = Column(Integer, default=0)
-    errors_corrected = Column(Integer, default=0)
-    vocabulary_learned = Column(Integer, default=0)
-    current_streak = Column(Integer, default=0)
-    longest_streak = Column(Integer, default=0)
-    last_practice_date = Column(Date)
-
-    user = relationship('User', back_populates='progress')
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey('users.id'), unique=True)
+    total_sessions: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    total_messages: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    errors_corrected: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    vocabulary_learned: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    # Streaks are day counts; SMALLINT keeps index and WAL entries small
+    current_streak: Mapped[Optional[int]] = mapped_column(SmallInteger, default=0)
+    longest_streak: Mapped[Optional[int]] = mapped_column(SmallInteger, default=0)
+    last_practice_date: Mapped[Optional[date]] = mapped_column(Date)
+
+    user: Mapped[Optional['User']] = relationship(back_populates='progress')
+
+    @classmethod
+    def touch(cls, session, user_id: int, messages: int = 0, errors: int = 0,
+              vocabulary: int = 0, sessions: int = 0):
+        """Record user activity in one upsert round-trip.
+
+        Select-then-insert-or-update costs two round-trips and races
+        concurrent workers; ON CONFLICT folds both into a single
+        prepared statement keyed on the unique user_id.
+        """
+        insert_fn = (pg_insert if session.get_bind().dialect.name == 'postgresql'
+                     else sqlite_insert)
+        stmt = insert_fn(cls).values(
+            user_id=user_id,
+            total_sessions=sessions,
+            total_messages=messages,
+            errors_corrected=errors,
+            vocabulary_learned=vocabulary,
+            last_practice_date=func.current_date(),
+        ).on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={
+                'total_sessions': cls.total_sessions + sessions,
+                'total_messages': cls.total_messages + messages,
+                'errors_corrected': cls.errors_corrected + errors,
+                'vocabulary_learned': cls.vocabulary_learned + vocabulary,
+                'last_practice_date': func.current_date(),
+            },
+        )
+        session.execute(stmt)
 
 
 class Vocabulary(Base):
     __tablename__ = 'vocabulary'
+    # Spaced-repetition scheduling scans by user and review recency
+    __table_args__ = (
+        Index('ix_vocab_user_lastrev', 'user_id', 'last_reviewed'),
+    )
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
-    word = Column(String(255), nullable=False)
-    definition = Column(Text)
-    example_sentence = Column(Text)
-    mastery_level = Column(Integer, default=0)
-    last_reviewed = Column(DateTime)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey('users.id'))
+    word: Mapped[str] = mapped_column(String(255))
+    definition: Mapped[Optional[str]] = mapped_column(Text)
+    example_sentence: Mapped[Optional[str]] = mapped_column(Text)
+    mastery_level: Mapped[Optional[int]] = mapped_column(SmallInteger, default=0)
+    last_reviewed: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
 
-    user = relationship('User', back_populates='vocabulary')
+    user: Mapped[Optional['User']] = relationship(back_populates='vocabulary')
 
 
 class APIKeyUsage(Base):
     """Track API key usage for rotation"""
     __tablename__ = 'api_key_usage'
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    key_index = Column(Integer, nullable=False)
-    request_count = Column(Integer, default=0)
-    last_used = Column(DateTime)
-    last_error = Column(DateTime)
-    error_count = Column(Integer, default=0)
-    created_at = Column(DateTime, default=datetime.utcnow)
-
-
-def get_database_url():
-    """Get database URL from environment"""
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # Unique so bump() is a single-row indexed update
+    key_index: Mapped[int] = mapped_column(SmallInteger, unique=True)
+    request_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    last_used: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    last_error: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    error_count: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
+
+    @classmethod
+    def bump(cls, session, key_index: int, had_error: bool = False):
+        """Count a call against a key in one atomic UPDATE.
+
+        Incrementing from Python (obj.request_count += 1) costs a
+        SELECT plus an UPDATE and races other workers; pushing the
+        arithmetic into the UPDATE makes it one round-trip whose plan
+        the server caches across rotations.
+        """
+        values = {'request_count': cls.request_count + 1,
+                  'last_used': func.now()}
+        if had_error:
+            values['error_count'] = cls.error_count + 1
+            values['last_error'] = func.now()
+
+        result = session.execute(
+            update(cls).where(cls.key_index == key_index).values(**values)
+        )
+        if result.rowcount == 0:
+            # First call on this key - create its counter row
+            session.add(cls(key_index=key_index, request_count=1,
+                            error_count=1 if had_error else 0))
+
+
+def _compute_database_url() -> str:
     # Railway provides DATABASE_URL automatically
     database_url = os.getenv('DATABASE_URL')
 
@@ -125,24 +283,482 @@ def get_database_url():
     return 'sqlite:///tutor.db'
 
 
+# Resolved once at import - the URL can't change mid-process, so no
+# caller should pay the env lookup and scheme rewrite again
+_DATABASE_URL = _compute_database_url()
+
+
+def get_database_url():
+    """Get database URL resolved from the environment at import"""
+    return _DATABASE_URL
+
+
+# One engine (and thus one warm connection pool) per process - building
+# an engine per call gives every query a cold pool and a fresh TCP+auth
+# handshake
+_ENGINE = None
+_SESSION_FACTORY = None
+_init_lock = threading.Lock()
+
+# Hot queries PREPAREd on every new PG connection, so each EXECUTE
+# skips parse+plan - including the first use of a freshly pooled
+# connection, which SQLAlchemy's client-side statement cache can't help
+_PREPARED_STATEMENTS = (
+    'PREPARE conv_recent(int, int) AS '
+    'SELECT id, session_id, role, content, created_at '
+    'FROM conversations WHERE session_id = $1 '
+    'ORDER BY created_at DESC LIMIT $2',
+
+    'PREPARE progress_by_user(int) AS '
+    'SELECT id, user_id, total_sessions, total_messages, errors_corrected, '
+    'vocabulary_learned, current_streak, longest_streak, last_practice_date '
+    'FROM user_progress WHERE user_id = $1',
+
+    'PREPARE vocab_due(int, int) AS '
+    'SELECT id, word, definition, example_sentence, mastery_level, last_reviewed '
+    'FROM vocabulary WHERE user_id = $1 '
+    'ORDER BY last_reviewed NULLS FIRST LIMIT $2',
+
+    'PREPARE errors_recent(int, int) AS '
+    'SELECT id, conversation_id, original_text, corrected_text, error_type, '
+    'explanation, created_at '
+    'FROM grammar_errors WHERE user_id = $1 '
+    'ORDER BY created_at DESC LIMIT $2',
+)
+
+
+def _is_pgbouncer(database_url: str) -> bool:
+    """Whether the URL points at a PgBouncer in front of Postgres"""
+    return ':6432' in database_url or os.getenv('PGBOUNCER') == '1'
+
+
+def _engine_kwargs(database_url: str) -> dict:
+    """Pool settings for the shared engine, with env overrides"""
+    # Compiled-SQL cache: the app re-runs a small set of statements, so
+    # a roomier cache avoids recompiling them under churn
+    if database_url.startswith('sqlite'):
+        # SQLite connects in-process; server pool sizing doesn't apply
+        return {'query_cache_size': 1200}
+    kwargs = {
+        'query_cache_size': 1200,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '5')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        # Retire connections before common idle-timeout cutoffs
+        # (load balancers, Railway proxies) can kill them mid-query
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        # LIFO keeps a small hot set of connections busy so their
+        # per-backend plan caches stay warm, while surplus connections
+        # idle long enough to be recycled
+        'pool_use_lifo': True,
+        'pool_pre_ping': True,
+        # psycopg2 fast execution: multi-row INSERT ... VALUES packets
+        # instead of one parse/bind/execute round-trip per row
+        'executemany_mode': 'values_plus_batch',
+        'executemany_values_page_size': 500,
+    }
+
+    if _is_pgbouncer(database_url):
+        # Behind a transaction-mode PgBouncer the pre-ping SELECT 1
+        # leaves server backends idle-in-transaction and the bouncer
+        # already multiplexes real server connections, so ping less,
+        # recycle fast, and bound runaway statements server-side
+        kwargs['pool_pre_ping'] = False
+        kwargs['pool_recycle'] = 60
+        kwargs['connect_args'] = {'options': '-c statement_timeout=30000'}
+    return kwargs
+
+
 def get_engine():
-    """Create and return database engine"""
-    database_url = get_database_url()
-    return create_engine(database_url, pool_pre_ping=True)
+    """Return the shared database engine, creating it on first use"""
+    global _ENGINE
+    if _ENGINE is None:
+        with _init_lock:
+            if _ENGINE is None:
+                database_url = get_database_url()
+                _ENGINE = create_engine(database_url,
+                                        **_engine_kwargs(database_url))
+                # Session-level SETs and named PREPAREs don't survive
+                # transaction pooling, so skip them behind PgBouncer
+                if (database_url.startswith('postgresql')
+                        and not _is_pgbouncer(database_url)):
+                    # Let PG switch to generic plans once a prepared
+                    # statement's custom plans stop beating them,
+                    # instead of re-planning every execution
+                    @event.listens_for(_ENGINE, 'connect')
+                    def _set_plan_cache_mode(dbapi_conn, connection_record):
+                        with dbapi_conn.cursor() as cursor:
+                            cursor.execute("SET plan_cache_mode = 'auto'")
+                            for statement in _PREPARED_STATEMENTS:
+                                # On an empty database (first boot,
+                                # before init_database creates the
+                                # schema) PREPARE fails with "relation
+                                # does not exist" - the connection must
+                                # still come up or the schema can never
+                                # be created. init_database disposes
+                                # the pool after create_all so no
+                                # connection missing its PREPAREs
+                                # outlives bootstrap.
+                                try:
+                                    cursor.execute(statement)
+                                except Exception:
+                                    dbapi_conn.rollback()
+    return _ENGINE
 
 
 def get_session():
-    """Create and return a database session"""
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Return a new database session from the shared factory"""
+    global _SESSION_FACTORY
+    if _SESSION_FACTORY is None:
+        with _init_lock:
+            if _SESSION_FACTORY is None:
+                # expire_on_commit=False keeps committed objects usable
+                # without a refresh round-trip per attribute access
+                _SESSION_FACTORY = sessionmaker(bind=get_engine(),
+                                                expire_on_commit=False)
+    return _SESSION_FACTORY()
+
+
+# Optional async path: the Flask app runs sync workers on psycopg2, but
+# async entry points (scripts, a future ASGI surface) can use asyncpg -
+# binary wire protocol plus a per-connection prepared-statement cache.
+# Imports are deferred so the asyncpg extra stays optional.
+_ASYNC_ENGINE = None
+_ASYNC_SESSION_FACTORY = None
+
+
+def get_async_engine():
+    """Return the shared asyncpg-backed engine, creating it on first use"""
+    global _ASYNC_ENGINE
+    if _ASYNC_ENGINE is None:
+        with _init_lock:
+            if _ASYNC_ENGINE is None:
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                database_url = get_database_url()
+                if database_url.startswith('postgresql://'):
+                    database_url = database_url.replace(
+                        'postgresql://', 'postgresql+asyncpg://', 1)
+                    _ASYNC_ENGINE = create_async_engine(
+                        database_url,
+                        pool_size=int(os.getenv('DB_POOL_SIZE', '10')),
+                        max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '5')),
+                        pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+                        connect_args={'prepared_statement_cache_size': 500},
+                    )
+                else:
+                    # SQLite fallback (needs the aiosqlite extra)
+                    _ASYNC_ENGINE = create_async_engine(
+                        database_url.replace('sqlite://', 'sqlite+aiosqlite://', 1)
+                    )
+    return _ASYNC_ENGINE
+
+
+def get_async_session():
+    """Return a new async database session from the shared factory"""
+    global _ASYNC_SESSION_FACTORY
+    if _ASYNC_SESSION_FACTORY is None:
+        with _init_lock:
+            if _ASYNC_SESSION_FACTORY is None:
+                from sqlalchemy.ext.asyncio import async_sessionmaker
+
+                _ASYNC_SESSION_FACTORY = async_sessionmaker(
+                    bind=get_async_engine(), expire_on_commit=False)
+    return _ASYNC_SESSION_FACTORY()
+
+
+def bulk_insert(session, model, rows):
+    """Insert many rows of one model in a single executemany batch.
+
+    Chat turns arrive as a conversation row plus several grammar-error
+    rows; routing them through executemany lets the psycopg2 fast path
+    send one multi-row VALUES packet instead of a round-trip per row.
+    Rows are plain dicts of column values.
+    """
+    if not rows:
+        return
+    session.execute(insert(model), rows)
+
+
+def export_conversations(session, user_id: int, batch_size: int = 500):
+    """Yield a user's full conversation history without materializing it.
+
+    .all() on a long history pulls every row and its content string
+    into memory at once; yield_per with stream_results keeps at most
+    one batch resident (a server-side cursor under psycopg2), so peak
+    memory stays flat no matter how long the history is. Callers can
+    write rows straight to a file or streamed HTTP response.
+    """
+    stmt = (
+        select(Conversation)
+        .join(Session, Conversation.session_id == Session.id)
+        .where(Session.user_id == user_id)
+        .order_by(Conversation.id)
+        .execution_options(yield_per=batch_size, stream_results=True)
+    )
+    yield from session.scalars(stmt)
+
+
+def _is_postgres(session) -> bool:
+    return session.get_bind().dialect.name == 'postgresql'
+
+
+def _can_execute_prepared(session) -> bool:
+    # Named PREPAREs don't survive PgBouncer's transaction pooling
+    return _is_postgres(session) and not _is_pgbouncer(get_database_url())
+
+
+def record_turn(session, user_id: int, errors=None):
+    """Persist one chat turn's bookkeeping in a single round-trip.
+
+    Inserting the turn's grammar errors and bumping the progress
+    counters separately costs a round-trip per statement. On Postgres a
+    data-modifying CTE inserts all error rows and folds their count
+    into the user_progress UPDATE as one prepared statement. SQLite has
+    no writable CTEs, so it falls back to a bulk insert plus the
+    upsert. Errors are dicts with original/corrected and optional
+    error_type/explanation keys.
+    """
+    errors = errors or []
+
+    if not _is_postgres(session):
+        if errors:
+            bulk_insert(session, GrammarError, [
+                {'user_id': user_id,
+                 'original_text': e.get('original', ''),
+                 'corrected_text': e.get('corrected', ''),
+                 'error_type': e.get('error_type'),
+                 'explanation': e.get('explanation')}
+                for e in errors
+            ])
+        UserProgress.touch(session, user_id, messages=1, errors=len(errors))
+        return
+
+    if not errors:
+        UserProgress.touch(session, user_id, messages=1)
+        return
+
+    params = {'uid': user_id}
+    values = []
+    for i, error in enumerate(errors):
+        values.append(f'(:uid, :orig{i}, :corr{i}, :type{i}, :expl{i})')
+        params[f'orig{i}'] = error.get('original', '')
+        params[f'corr{i}'] = error.get('corrected', '')
+        params[f'type{i}'] = error.get('error_type')
+        params[f'expl{i}'] = ZstdText.encode(error.get('explanation'))
+
+    result = session.execute(text(
+        'WITH ins AS ('
+        'INSERT INTO grammar_errors '
+        '(user_id, original_text, corrected_text, error_type, explanation) '
+        'VALUES ' + ', '.join(values) + ' RETURNING 1) '
+        'UPDATE user_progress SET '
+        'total_messages = total_messages + 1, '
+        'errors_corrected = errors_corrected + (SELECT count(*) FROM ins), '
+        'last_practice_date = current_date '
+        'WHERE user_id = :uid'
+    ), params)
+    if result.rowcount == 0:
+        # No progress row yet; the errors are inserted, so only the
+        # counters still need creating
+        UserProgress.touch(session, user_id, messages=1, errors=len(errors))
+
+
+def load_recent_conversations(session, session_id: int, limit: int = 50):
+    """Most recent messages of one chat session, newest first"""
+    if _can_execute_prepared(session):
+        # EXECUTE bypasses the ORM type map, so content comes back as
+        # raw bytea and needs decoding here
+        rows = session.execute(text('EXECUTE conv_recent(:sid, :n)'),
+                               {'sid': session_id, 'n': limit}).mappings().all()
+        return [{**row, 'content': ZstdText.decode(row['content'])}
+                for row in rows]
+    return session.execute(
+        select(Conversation.id, Conversation.session_id, Conversation.role,
+               Conversation.content, Conversation.created_at)
+        .where(Conversation.session_id == session_id)
+        .order_by(Conversation.created_at.desc())
+        .limit(limit)
+    ).mappings().all()
+
+
+def load_user_progress(session, user_id: int):
+    """The progress row for one user as a mapping, or None"""
+    if _can_execute_prepared(session):
+        return session.execute(text('EXECUTE progress_by_user(:uid)'),
+                               {'uid': user_id}).mappings().first()
+    return session.execute(
+        select(UserProgress.id, UserProgress.user_id,
+               UserProgress.total_sessions, UserProgress.total_messages,
+               UserProgress.errors_corrected, UserProgress.vocabulary_learned,
+               UserProgress.current_streak, UserProgress.longest_streak,
+               UserProgress.last_practice_date)
+        .where(UserProgress.user_id == user_id)
+    ).mappings().first()
+
+
+def load_due_vocabulary(session, user_id: int, limit: int = 20):
+    """A user's vocabulary, least-recently reviewed first"""
+    if _can_execute_prepared(session):
+        return session.execute(text('EXECUTE vocab_due(:uid, :n)'),
+                               {'uid': user_id, 'n': limit}).mappings().all()
+    return session.execute(
+        select(Vocabulary.id, Vocabulary.word, Vocabulary.definition,
+               Vocabulary.example_sentence, Vocabulary.mastery_level,
+               Vocabulary.last_reviewed)
+        .where(Vocabulary.user_id == user_id)
+        .order_by(Vocabulary.last_reviewed.asc().nulls_first())
+        .limit(limit)
+    ).mappings().all()
+
+
+def load_recent_errors(session, user_id: int, limit: int = 50):
+    """A user's latest grammar errors, newest first"""
+    if _can_execute_prepared(session):
+        rows = session.execute(text('EXECUTE errors_recent(:uid, :n)'),
+                               {'uid': user_id, 'n': limit}).mappings().all()
+        return [{**row, 'explanation': ZstdText.decode(row['explanation'])}
+                for row in rows]
+    return session.execute(
+        select(GrammarError.id, GrammarError.conversation_id,
+               GrammarError.original_text, GrammarError.corrected_text,
+               GrammarError.error_type, GrammarError.explanation,
+               GrammarError.created_at)
+        .where(GrammarError.user_id == user_id)
+        .order_by(GrammarError.created_at.desc())
+        .limit(limit)
+    ).mappings().all()
+
+
+# Scalar subqueries instead of LEFT JOINs to vocabulary and
+# grammar_errors: joining both would fan out to vocab_cnt * err_cnt
+# rows per user before the GROUP BY collapses them again.
+_DASHBOARD_SELECT_SQL = (
+    'SELECT u.id AS user_id, '
+    'coalesce(up.total_sessions, 0) AS total_sessions, '
+    'coalesce(up.current_streak, 0) AS current_streak, '
+    '(SELECT count(*) FROM vocabulary v WHERE v.user_id = u.id) AS vocab_cnt, '
+    '(SELECT count(*) FROM grammar_errors ge WHERE ge.user_id = u.id) AS err_cnt '
+    'FROM users u LEFT JOIN user_progress up ON up.user_id = u.id'
+)
+
+
+def create_dashboard_view(session):
+    """Create the user_dashboard view if it does not exist.
+
+    On Postgres this is a materialized view with a unique index on
+    user_id (required for REFRESH ... CONCURRENTLY); SQLite has no
+    materialized views, so it gets a plain view that computes the same
+    shape on read. Deliberately not part of Base.metadata - create_all
+    only knows tables and would otherwise try to manage it.
+    """
+    if _is_postgres(session):
+        session.execute(text(
+            'CREATE MATERIALIZED VIEW IF NOT EXISTS user_dashboard AS '
+            + _DASHBOARD_SELECT_SQL))
+        session.execute(text(
+            'CREATE UNIQUE INDEX IF NOT EXISTS ix_user_dashboard_user '
+            'ON user_dashboard (user_id)'))
+    else:
+        session.execute(text(
+            'CREATE VIEW IF NOT EXISTS user_dashboard AS '
+            + _DASHBOARD_SELECT_SQL))
+
+
+def refresh_dashboard_view(session):
+    """Bring user_dashboard up to date after batched writes.
+
+    CONCURRENTLY keeps dashboard reads unblocked during the refresh, at
+    the cost of needing the unique index. No-op on SQLite, where the
+    plain view is always current.
+    """
+    if _is_postgres(session):
+        # REFRESH ... CONCURRENTLY refuses to run inside a transaction
+        # block, and session.execute always opens one, so issue it on
+        # an autocommit connection instead
+        with session.get_bind().connect().execution_options(
+                isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(
+                'REFRESH MATERIALIZED VIEW CONCURRENTLY user_dashboard'))
+
+
+def load_dashboard(session, user_id: int):
+    """One user's dashboard row: progress counters plus vocab/error counts"""
+    return session.execute(
+        text('SELECT * FROM user_dashboard WHERE user_id = :uid'),
+        {'uid': user_id}
+    ).mappings().first()
+
+
+# Indexes added after the initial schema shipped; names match what
+# create_all generates so fresh and upgraded databases end up identical
+_UPGRADE_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ix_conv_session_created '
+    'ON conversations (session_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_grammar_user_created '
+    'ON grammar_errors (user_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_vocab_user_lastrev '
+    'ON vocabulary (user_id, last_reviewed)',
+    'CREATE INDEX IF NOT EXISTS ix_sessions_user_id '
+    'ON sessions (user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_grammar_errors_conversation_id '
+    'ON grammar_errors (conversation_id)',
+    # Single-column indexes made redundant by the composites that lead
+    # on the same column; databases created mid-series may carry them
+    'DROP INDEX IF EXISTS ix_conversations_session_id',
+    'DROP INDEX IF EXISTS ix_grammar_errors_user_id',
+    'DROP INDEX IF EXISTS ix_vocabulary_user_id',
+)
+
+
+def _upgrade_schema(engine):
+    """Bring a pre-existing database up to the current schema.
+
+    The has_table sentinel skips create_all entirely on existing
+    databases, so schema changes made after first deploy are applied
+    here, idempotently: the newer indexes (IF NOT EXISTS on both
+    backends) and the text-to-bytea switch for the zstd-compressed
+    columns. The ALTER is Postgres-only - SQLite happily stores bytes
+    in its TEXT-affinity columns, and ZstdText.decode handles the str
+    values of legacy rows. CHECK constraints stay fresh-database-only,
+    since legacy rows might violate them.
+    """
+    with engine.begin() as conn:
+        for statement in _UPGRADE_INDEXES:
+            conn.execute(text(statement))
+        if engine.dialect.name != 'postgresql':
+            return
+        inspector = inspect(conn)
+        for table, column in (('conversations', 'content'),
+                              ('grammar_errors', 'explanation')):
+            columns = {c['name']: c for c in inspector.get_columns(table)}
+            if not isinstance(columns[column]['type'], LargeBinary):
+                conn.execute(text(
+                    f'ALTER TABLE {table} ALTER COLUMN {column} TYPE bytea '
+                    f"USING convert_to({column}, 'UTF8')"))
 
 
 def init_database():
     """Initialize database tables"""
     engine = get_engine()
-    Base.metadata.create_all(engine)
-    print("Database tables created successfully")
+    # One sentinel lookup instead of a per-table existence query for
+    # every CREATE TABLE IF NOT EXISTS on every process start; the
+    # tables ship together, so checking one answers for all
+    if inspect(engine).has_table('users'):
+        _upgrade_schema(engine)
+        print("Database tables already exist")
+    else:
+        Base.metadata.create_all(engine, checkfirst=False)
+        # The bootstrap connection connected before the tables existed,
+        # so its PREPAREs were skipped; retire it and let the pool
+        # rebuild with fully prepared connections
+        engine.dispose()
+        print("Database tables created successfully")
+    # The view DDL is IF NOT EXISTS-idempotent and must also reach
+    # databases created before the view shipped, so run it every start
+    with get_session() as session:
+        create_dashboard_view(session)
+        session.commit()
 
 
 if __name__ == '__main__':